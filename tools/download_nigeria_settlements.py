@@ -3,27 +3,69 @@
 from __future__ import annotations
 
 import argparse
-import json
-import re
+import email.utils
+import functools
+import io
+import sqlite3
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
 import zipfile
 
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 import shapefile  # type: ignore
+from urllib3.util.retry import Retry
 import sys
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    import json as orjson  # type: ignore[no-redef]
+
+try:
+    from requests_cache import CachedSession
+except ImportError:  # pragma: no cover - requests-cache is optional
+    CachedSession = None  # type: ignore[assignment,misc]
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - httpx is only needed for --http2
+    httpx = None  # type: ignore[assignment]
+
+SDINET_ORIGIN = "https://sdinet.org"
 FILTER_ENDPOINT = "https://sdinet.org/wp-content/themes/sdinet-2022/ajax/get-filter.php"
 SETTLEMENT_URL = "https://sdinet.org/settlement/{form_id}/{ona_id}"
 WGS84_PRJ = (
     'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,'
     "298.257223563]],PRIMEM['Greenwich',0],UNIT['degree',0.0174532925199433]]"
 )
-SETTLEMENT_RE = re.compile(r"var settlement = (\{.*?\});", re.S)
-SHAPE_RE = re.compile(r"var shape = (\[\[.*?\]\]);", re.S)
+SETTLEMENT_MARKER = b"var settlement = "
+SHAPE_MARKER = b"var shape = "
+DEFAULT_CONCURRENCY = 16
+MAX_RETRIES = 3
+WRITE_BUFFER_SIZE = 1 << 20
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_AFTER_STATUSES = (429, 503)
+HTTP_CACHE_NAME = ".kyc_cache"
+HTTP_CACHE_TTL = 24 * 3600
+FILTER_CACHE_TTL = 3600
+PAGE_CACHE_PATH = ".kyc_pagecache.sqlite"
+PAGE_CACHE_COMMIT_EVERY = 50
+
+PageData = Tuple[Dict, List[Tuple[float, float]]]
+HttpSession = Union[requests.Session, "httpx.Client"]
+HttpResponse = Union[requests.Response, "httpx.Response"]
+FETCH_ERRORS: Tuple[Type[Exception], ...] = (requests.RequestException,)
+if httpx is not None:
+    FETCH_ERRORS += (httpx.HTTPError,)
+_NA_VALUES = frozenset({"na", "n/a", "nan"})
+_DATE_FMTS = ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y")
 
 
 @dataclass
@@ -65,17 +107,159 @@ def parse_args() -> argparse.Namespace:
         default="kyc_cln_data_Nigeria_latest",
         help="Output shapefile base name (without extension)",
     )
+    parser.add_argument(
+        "--format",
+        choices=("shp", "gpkg"),
+        default="shp",
+        help=(
+            "Output format: a zipped shapefile (default) or a GeoPackage, which "
+            "is written by GDAL and is much faster for large exports "
+            "(requires geopandas and pyogrio)"
+        ),
+    )
     parser.add_argument(
         "--sleep",
         type=float,
-        default=0.2,
-        help="Seconds to sleep between settlement page requests",
+        default=0.0,
+        help=(
+            "Minimum seconds between settlement page requests across all "
+            "workers (0 disables throttling)"
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=(
+            f"Always re-download and re-parse pages instead of reusing the "
+            f"local {PAGE_CACHE_PATH} page cache and {HTTP_CACHE_NAME}.sqlite "
+            "HTTP cache (the latter needs requests-cache)"
+        ),
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help=(
+            "Multiplex page requests over a few HTTP/2 connections with httpx "
+            "(requires httpx[http2]; bypasses the requests-cache HTTP cache)"
+        ),
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Number of settlement pages fetched in parallel (default {DEFAULT_CONCURRENCY})",
     )
     return parser.parse_args()
 
 
-def fetch_filter_payload() -> Dict:
-    response = requests.get(FILTER_ENDPOINT, timeout=60)
+def build_session(
+    pool_size: int = DEFAULT_CONCURRENCY, use_cache: bool = True
+) -> requests.Session:
+    """Create a keep-alive session that retries transient sdinet.org failures.
+
+    When requests-cache is installed and ``use_cache`` is set, successful GETs
+    are kept in a local SQLite cache so re-runs skip the network.
+    """
+    session: requests.Session
+    if use_cache and CachedSession is not None:
+        session = CachedSession(
+            HTTP_CACHE_NAME,
+            backend="sqlite",
+            expire_after=HTTP_CACHE_TTL,
+            allowable_methods=["GET"],
+            # The country index changes more often than settlement pages.
+            urls_expire_after={FILTER_ENDPOINT: FILTER_CACHE_TTL},
+        )
+    else:
+        session = requests.Session()
+    session.headers.update(
+        {"User-Agent": "kyc-downloader/0.1", "Connection": "keep-alive"}
+    )
+    # Retry honours Retry-After on 429/503, so throttling adapts to the server.
+    retries = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=retries
+    )
+    session.mount(SDINET_ORIGIN, adapter)
+    return session
+
+
+def _retry_after_seconds(value: Optional[str]) -> float:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, when.timestamp() - time.time())
+
+
+if httpx is not None:
+
+    class _StatusRetryTransport(httpx.BaseTransport):
+        """Retry 429/5xx responses with exponential backoff, like build_session.
+
+        As with urllib3's Retry, a Retry-After header on 429/503 responses
+        replaces the backoff when it asks for a longer wait.
+        """
+
+        def __init__(self, transport: "httpx.BaseTransport") -> None:
+            self._transport = transport
+
+        def handle_request(self, request: "httpx.Request") -> "httpx.Response":
+            for attempt in range(MAX_RETRIES):
+                response = self._transport.handle_request(request)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = 0.5 * 2**attempt
+                if response.status_code in RETRY_AFTER_STATUSES:
+                    retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                    delay = max(retry_after, delay)
+                response.close()
+                time.sleep(delay)
+            return self._transport.handle_request(request)
+
+        def close(self) -> None:
+            self._transport.close()
+
+
+def build_http2_client(pool_size: int = DEFAULT_CONCURRENCY) -> "httpx.Client":
+    """Create an httpx client that multiplexes concurrent GETs over HTTP/2.
+
+    The client is shared by the download threads; servers that only speak
+    HTTP/1.1 are handled transparently.
+    """
+    if httpx is None:
+        raise SystemExit("--http2 requires httpx (pip install 'httpx[http2]')")
+    limits = httpx.Limits(
+        max_keepalive_connections=4, max_connections=max(1, pool_size)
+    )
+    try:
+        transport = httpx.HTTPTransport(
+            http2=True, limits=limits, retries=MAX_RETRIES
+        )
+    except ImportError as exc:
+        raise SystemExit(f"--http2 requires httpx[http2] ({exc})") from exc
+    return httpx.Client(
+        transport=_StatusRetryTransport(transport),
+        headers={"User-Agent": "kyc-downloader/0.1"},
+        follow_redirects=True,
+    )
+
+
+def fetch_filter_payload(session: HttpSession) -> Dict:
+    response = session.get(FILTER_ENDPOINT, timeout=60)
     response.raise_for_status()
     return response.json()
 
@@ -118,7 +302,7 @@ def _safe_float(value: Optional[str]) -> Optional[float]:
         return float(value)
     if isinstance(value, str):
         value = value.strip()
-        if not value or value.lower() in {"na", "n/a", "nan"}:
+        if not value or value.lower() in _NA_VALUES:
             return None
     try:
         return float(value)
@@ -133,6 +317,7 @@ def _safe_int(value: Optional[str]) -> Optional[int]:
     return int(round(number))
 
 
+@functools.lru_cache(maxsize=4096)
 def _format_date(raw_value: Optional[str]) -> Tuple[str, Optional[int]]:
     if not raw_value:
         return "Unknown", None
@@ -144,7 +329,7 @@ def _format_date(raw_value: Optional[str]) -> Tuple[str, Optional[int]]:
         text = text.split("T", 1)[0]
 
     parsed: Optional[datetime] = None
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y"):
+    for fmt in _DATE_FMTS:
         try:
             parsed = datetime.strptime(text, fmt)
             break
@@ -160,91 +345,232 @@ def _format_date(raw_value: Optional[str]) -> Tuple[str, Optional[int]]:
     return parsed.strftime("%d.%m.%Y"), parsed.year
 
 
-def parse_settlement_page(html: str) -> Tuple[Dict, List[Tuple[float, float]]]:
-    settlement_match = SETTLEMENT_RE.search(html)
-    if not settlement_match:
-        raise ValueError("Could not locate settlement payload in page")
-    payload = json.loads(settlement_match.group(1))
+def _extract_payload(
+    content: bytes, marker: bytes, opener: bytes, closer: bytes
+) -> Optional[bytes]:
+    """Return the JS literal assigned after ``marker``.
 
-    shape_match = SHAPE_RE.search(html)
-    if not shape_match:
+    Equivalent to the lazy ``marker(opener.*?closer);`` regex: the literal
+    runs from ``opener`` to the first ``closer;`` after it. ``bytes.find``
+    does both scans in C without the regex engine's per-byte backtracking.
+    """
+    start = content.find(marker + opener)
+    if start < 0:
+        return None
+    start += len(marker)
+    end = content.find(closer + b";", start + len(opener))
+    if end < 0:
+        return None
+    return content[start : end + len(closer)]
+
+
+def parse_settlement_page(content: bytes) -> Tuple[Dict, List[Tuple[float, float]]]:
+    settlement_json = _extract_payload(content, SETTLEMENT_MARKER, b"{", b"}")
+    if settlement_json is None:
+        raise ValueError("Could not locate settlement payload in page")
+    shape_json = _extract_payload(content, SHAPE_MARKER, b"[[", b"]]")
+    if shape_json is None:
         raise ValueError("Could not locate geometry payload in page")
-    shape_raw = json.loads(shape_match.group(1))
-    geometry: List[Tuple[float, float]] = []
-    for lat_str, lon_str in shape_raw:
-        lat = float(lat_str)
-        lon = float(lon_str)
-        geometry.append((lon, lat))
 
-    if geometry and geometry[0] != geometry[-1]:
-        geometry.append(geometry[0])
+    payload = orjson.loads(settlement_json)
+    shape_raw = orjson.loads(shape_json)
+    coords = np.asarray(shape_raw, dtype=np.float64)
+    if coords.ndim != 2 or coords.shape[1] != 2 or not np.isfinite(coords).all():
+        raise ValueError("Could not parse geometry payload in page")
+    # The page lists (lat, lon) pairs; shapefiles expect (lon, lat).
+    coords = coords[:, ::-1]
+    if len(coords) and not np.array_equal(coords[0], coords[-1]):
+        coords = np.vstack([coords, coords[:1]])
+    geometry: List[Tuple[float, float]] = list(map(tuple, coords.tolist()))
 
     return payload, geometry
 
 
-def build_parsed_records(
-    settlements: Iterable[SettlementRecord], sleep_seconds: float
-) -> Tuple[List[ParsedSettlement], List[Tuple[SettlementRecord, str]]]:
-    session = requests.Session()
-    session.headers.update({"User-Agent": "kyc-downloader/0.1"})
+class _Throttle:
+    """Enforce a minimum interval between request starts across threads."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _build_record(
+    rec_id: int,
+    settlement: SettlementRecord,
+    payload: Dict,
+    geometry: List[Tuple[float, float]],
+) -> ParsedSettlement:
+    last_updated = payload.get("section_A/A1a_Last_Updated") or payload.get(
+        "section_A/A1_Profile_Date"
+    )
+    formatted_date, year = _format_date(last_updated)
+
+    population = _safe_int(payload.get("section_C/C11_Population_Estimate"))
+    if not population or population <= 0:
+        households = _safe_float(payload.get("section_C/C9_Households")) or 0
+        hh_size = _safe_float(payload.get("section_C/C10_Household_Size")) or 0
+        computed = int(round(households * hh_size))
+        population = computed if computed > 0 else None
+
+    area_acres = _safe_float(payload.get("section_B/B2b_Area_acres"))
+    structures = _safe_int(payload.get("section_C/C5_Structures_Total"))
+
+    return ParsedSettlement(
+        rec_id=rec_id,
+        city=settlement.city,
+        name=settlement.name,
+        last_updated=formatted_date,
+        year=year,
+        population=population,
+        area_acres=area_acres,
+        structures=structures,
+        geometry=geometry,
+    )
+
+
+def _fetch_page(
+    session: HttpSession, throttle: _Throttle, url: str
+) -> HttpResponse:
+    throttle.wait()
+    return session.get(url, timeout=60)
+
+
+def open_page_cache(path: str = PAGE_CACHE_PATH) -> sqlite3.Connection:
+    """Open the SQLite store of parsed settlement pages keyed on ona_id."""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS pages ("
+        "ona_id TEXT PRIMARY KEY, payload BLOB, shape BLOB, fetched_at REAL)"
+    )
+    return connection
+
+
+def _load_cached_page(cache: sqlite3.Connection, ona_id: str) -> Optional[PageData]:
+    row = cache.execute(
+        "SELECT payload, shape FROM pages WHERE ona_id = ? AND fetched_at >= ?",
+        (ona_id, time.time() - HTTP_CACHE_TTL),
+    ).fetchone()
+    if row is None:
+        return None
+    payload, shape = row
+    return orjson.loads(payload), [tuple(point) for point in orjson.loads(shape)]
 
-    parsed: List[ParsedSettlement] = []
-    failures: List[Tuple[SettlementRecord, str]] = []
-    for idx, settlement in enumerate(settlements, start=1):
-        try:
-            response = session.get(settlement.url, timeout=60)
-            payload, geometry = parse_settlement_page(response.text)
-        except requests.RequestException as exc:
-            message = f"{settlement.name} ({settlement.url}) - {exc}"
-            print(f"Warning: {message}", file=sys.stderr)
-            failures.append((settlement, str(exc)))
-            continue
-        except ValueError as exc:
-            status = response.status_code
-            message = (
-                f"{settlement.name} ({settlement.url}) - "
-                f"HTTP {status}: {exc}"
-            )
-            print(f"Warning: {message}", file=sys.stderr)
-            failures.append((settlement, str(exc)))
-            continue
 
-        last_updated = payload.get("section_A/A1a_Last_Updated") or payload.get(
-            "section_A/A1_Profile_Date"
+def _store_page(cache: sqlite3.Connection, ona_id: str, page: PageData) -> None:
+    payload, geometry = page
+    cache.execute(
+        "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+        (ona_id, orjson.dumps(payload), orjson.dumps(geometry), time.time()),
+    )
+
+
+def _evict_cached_response(session: HttpSession, url: str) -> None:
+    """Drop a page from the requests-cache store so the next run refetches it."""
+    cache = getattr(session, "cache", None)
+    if cache is not None:
+        cache.delete(urls=[url])
+
+
+def _parse_download(
+    settlement: SettlementRecord, future: "Future[HttpResponse]"
+) -> Tuple[Optional[PageData], Optional[str]]:
+    try:
+        response = future.result()
+        page = parse_settlement_page(response.content)
+    except FETCH_ERRORS as exc:
+        message = f"{settlement.name} ({settlement.url}) - {exc}"
+        print(f"Warning: {message}", file=sys.stderr)
+        return None, str(exc)
+    except ValueError as exc:
+        status = response.status_code
+        message = (
+            f"{settlement.name} ({settlement.url}) - "
+            f"HTTP {status}: {exc}"
         )
-        formatted_date, year = _format_date(last_updated)
-
-        population = _safe_int(payload.get("section_C/C11_Population_Estimate"))
-        if not population or population <= 0:
-            households = _safe_float(payload.get("section_C/C9_Households")) or 0
-            hh_size = _safe_float(payload.get("section_C/C10_Household_Size")) or 0
-            computed = int(round(households * hh_size))
-            population = computed if computed > 0 else None
-
-        area_acres = _safe_float(payload.get("section_B/B2b_Area_acres"))
-        structures = _safe_int(payload.get("section_C/C5_Structures_Total"))
-
-        parsed.append(
-            ParsedSettlement(
-                rec_id=idx,
-                city=settlement.city,
-                name=settlement.name,
-                last_updated=formatted_date,
-                year=year,
-                population=population,
-                area_acres=area_acres,
-                structures=structures,
-                geometry=geometry,
+        print(f"Warning: {message}", file=sys.stderr)
+        return None, str(exc)
+
+    return page, None
+
+
+def build_parsed_records(
+    session: HttpSession,
+    settlements: Iterable[SettlementRecord],
+    sleep_seconds: float,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    page_cache: Optional[sqlite3.Connection] = None,
+) -> Tuple[List[ParsedSettlement], List[Tuple[SettlementRecord, str]]]:
+    settlements = list(settlements)
+    throttle = _Throttle(sleep_seconds)
+
+    outcomes: List[Tuple[Optional[ParsedSettlement], Optional[str]]] = [
+        (None, None)
+    ] * len(settlements)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {}
+        for idx, settlement in enumerate(settlements, start=1):
+            cached = (
+                _load_cached_page(page_cache, settlement.settlement_id)
+                if page_cache is not None
+                else None
             )
-        )
+            if cached is not None:
+                outcomes[idx - 1] = (_build_record(idx, settlement, *cached), None)
+                continue
+            future = executor.submit(_fetch_page, session, throttle, settlement.url)
+            futures[future] = (idx, settlement)
+
+        # Parse on this thread while the workers keep downloading.
+        pending = 0
+        for future in as_completed(futures):
+            idx, settlement = futures[future]
+            page, error = _parse_download(settlement, future)
+            if page is None:
+                # A 200 placeholder or maintenance page must not be replayed
+                # from the HTTP cache on the next run.
+                _evict_cached_response(session, settlement.url)
+                outcomes[idx - 1] = (None, error)
+                continue
+            outcomes[idx - 1] = (_build_record(idx, settlement, *page), None)
+            if page_cache is not None:
+                _store_page(page_cache, settlement.settlement_id, page)
+                pending += 1
+                if pending >= PAGE_CACHE_COMMIT_EVERY:
+                    page_cache.commit()
+                    pending = 0
+        if page_cache is not None:
+            page_cache.commit()
 
-        time.sleep(sleep_seconds)
+    parsed: List[ParsedSettlement] = []
+    failures: List[Tuple[SettlementRecord, str]] = []
+    for settlement, (record, error) in zip(settlements, outcomes):
+        if record is None:
+            failures.append((settlement, error or ""))
+        else:
+            parsed.append(record)
 
     return parsed, failures
 
 
-def write_shapefile(records: List[ParsedSettlement], output_base: Path) -> Path:
-    writer = shapefile.Writer(str(output_base))
+def write_shapefile(
+    records: List[ParsedSettlement], output_base: Path, country: str
+) -> Path:
+    # pyshp seeks back to write headers, so build the members in memory and
+    # add them to the archive without touching disk.
+    shp_file, shx_file, dbf_file = io.BytesIO(), io.BytesIO(), io.BytesIO()
+    writer = shapefile.Writer(shp=shp_file, shx=shx_file, dbf=dbf_file)
     writer.autoBalance = 1
 
     writer.field("Id", "N", 6, 0)
@@ -257,10 +583,12 @@ def write_shapefile(records: List[ParsedSettlement], output_base: Path) -> Path:
     writer.field("kyc_struct", "N", 10, 0)
     writer.field("kyc_year", "N", 6, 0)
 
+    add_record = writer.record
+    add_poly = writer.poly
     for record in records:
-        writer.record(
+        add_record(
             record.rec_id,
-            "Nigeria",
+            country,
             record.city,
             record.name,
             record.last_updated,
@@ -269,45 +597,113 @@ def write_shapefile(records: List[ParsedSettlement], output_base: Path) -> Path:
             record.structures or 0,
             record.year or 0,
         )
-        writer.poly([record.geometry])
+        add_poly([record.geometry])
 
     writer.close()
 
-    prj_path = output_base.with_suffix(".prj")
-    prj_path.write_text(WGS84_PRJ, encoding="utf-8")
-    cpg_path = output_base.with_suffix(".cpg")
-    cpg_path.write_text("UTF-8", encoding="utf-8")
-
+    members = {
+        ".cpg": b"UTF-8",
+        ".dbf": dbf_file.getvalue(),
+        ".prj": WGS84_PRJ.encode("utf-8"),
+        ".shp": shp_file.getvalue(),
+        ".shx": shx_file.getvalue(),
+    }
     zip_path = output_base.with_suffix(".zip")
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
-        for suffix in (".cpg", ".dbf", ".prj", ".shp", ".shx"):
-            file_path = output_base.with_suffix(suffix)
-            archive.write(file_path, arcname=output_base.name + suffix)
-
-    for suffix in (".cpg", ".dbf", ".prj", ".shp", ".shx"):
-        file_path = output_base.with_suffix(suffix)
-        if file_path.exists():
-            file_path.unlink()
+    date_time = time.localtime()[:6]
+    # zlib hands ZipFile many small chunks; batch them into large writes.
+    with open(zip_path, "wb", buffering=WRITE_BUFFER_SIZE) as handle, zipfile.ZipFile(
+        handle, "w", compression=zipfile.ZIP_DEFLATED
+    ) as archive:
+        for suffix, data in members.items():
+            # Match what archive.write() recorded for regular 0644 files.
+            info = zipfile.ZipInfo(output_base.name + suffix, date_time=date_time)
+            info.external_attr = 0o100644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data)
 
     return zip_path
 
 
+def write_geopackage(
+    records: List[ParsedSettlement], output_base: Path, country: str
+) -> Path:
+    try:
+        import geopandas as gpd  # type: ignore
+        import pyogrio  # type: ignore
+        import shapely  # type: ignore
+        import shapely.errors  # type: ignore
+    except ImportError as exc:
+        raise SystemExit(
+            f"--format gpkg requires geopandas and pyogrio ({exc})"
+        ) from exc
+
+    geometries = []
+    for record in records:
+        try:
+            geometries.append(shapely.Polygon(record.geometry))
+        except (ValueError, shapely.errors.ShapelyError) as exc:
+            # Too few or unusable boundary points; keep the record, as the
+            # shapefile writer does, but without a geometry.
+            print(
+                f"Warning: {record.name} (Id {record.rec_id}) - "
+                f"written with empty geometry: {exc}",
+                file=sys.stderr,
+            )
+            geometries.append(None)
+
+    # Same columns and fill values as the shapefile, in one vectorized write.
+    frame = gpd.GeoDataFrame(
+        {
+            "Id": [record.rec_id for record in records],
+            "Country": [country] * len(records),
+            "City": [record.city for record in records],
+            "Settlement": [record.name for record in records],
+            "Last_updat": [record.last_updated for record in records],
+            "kyc_pop": [record.population or 0 for record in records],
+            "kyc_area": [record.area_acres or 0.0 for record in records],
+            "kyc_struct": [record.structures or 0 for record in records],
+            "kyc_year": [record.year or 0 for record in records],
+        },
+        geometry=geometries,
+        crs="EPSG:4326",
+    )
+    gpkg_path = output_base.with_suffix(".gpkg")
+    pyogrio.write_dataframe(frame, gpkg_path, driver="GPKG")
+    return gpkg_path
+
+
 def main() -> None:
     args = parse_args()
-    payload = fetch_filter_payload()
-    settlements = list_country_settlements(payload, args.country)
-    if not settlements:
-        raise SystemExit(f"No settlements found for country '{args.country}'")
-
-    parsed_records, failures = build_parsed_records(settlements, args.sleep)
+    session: HttpSession
+    if args.http2:
+        session = build_http2_client(args.concurrency)
+    else:
+        session = build_session(args.concurrency, use_cache=not args.no_cache)
+    with session:
+        payload = fetch_filter_payload(session)
+        settlements = list_country_settlements(payload, args.country)
+        if not settlements:
+            raise SystemExit(f"No settlements found for country '{args.country}'")
+
+        page_cache = None if args.no_cache else open_page_cache()
+        try:
+            parsed_records, failures = build_parsed_records(
+                session, settlements, args.sleep, args.concurrency, page_cache
+            )
+        finally:
+            if page_cache is not None:
+                page_cache.close()
     if not parsed_records:
         raise SystemExit("No settlements could be downloaded successfully")
     output_base = Path(args.output)
-    zip_path = write_shapefile(parsed_records, output_base)
+    if args.format == "gpkg":
+        output_path = write_geopackage(parsed_records, output_base, args.country)
+    else:
+        output_path = write_shapefile(parsed_records, output_base, args.country)
 
     print(
-        f"Wrote {len(parsed_records)} settlements to {zip_path.name} "
-        f"({zip_path.resolve()})"
+        f"Wrote {len(parsed_records)} settlements to {output_path.name} "
+        f"({output_path.resolve()})"
     )
     if failures:
         print(f"Skipped {len(failures)} settlement(s); see warnings above.")
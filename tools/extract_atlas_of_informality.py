@@ -11,13 +11,43 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import functools
 import json
 import math
+import os
 import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - ijson is an optional dependency
+    ijson = None  # type: ignore[assignment]
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None  # type: ignore[assignment]
 
 ORIGIN_SHIFT = 2 * math.pi * 6378137 / 2.0  # Radius used by EPSG:3857
+# With --jit, only arrays at least this large go to the Numba kernel. NumPy
+# converts 4k vertices in ~0.15 ms, far below the kernel's first-call
+# compile/cache-load cost, and no benchmark so far has shown the kernel
+# beating NumPy, so it is opt-in.
+JIT_MIN_VERTICES = 4096
+# Smaller maps are exported serially; process start-up would dominate.
+PARALLEL_MIN_LAYERS = 4
+SOURCE_APP_ID = "110e3d637cce4fe7bc41c4e5cd3f9d21"
+# Web maps at least this large are streamed with ijson. On the bundled 1.4 MB
+# map a full orjson decode is faster and peaks lower; at 28 MB streaming peaks
+# at ~15 MB versus ~200 MB for the full decode.
+STREAM_MIN_BYTES = 16 * 1024 * 1024
 
 
 def mercator_to_lonlat(x: float, y: float) -> Tuple[float, float]:
@@ -28,6 +58,72 @@ def mercator_to_lonlat(x: float, y: float) -> Tuple[float, float]:
     return lon, lat
 
 
+_use_jit = False
+
+
+def enable_jit(enabled: bool = True) -> None:
+    """Route large coordinate arrays through the optional Numba kernel."""
+    global _use_jit
+    _use_jit = enabled
+
+
+@functools.lru_cache(maxsize=None)
+def load_mercator_kernel() -> Optional[Callable[[np.ndarray, np.ndarray], None]]:
+    """Import numba and build the JIT kernel on first use; None without numba."""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def mercator_kernel(xy: np.ndarray, out: np.ndarray) -> None:
+        # Same formula as mercator_to_lonlat, fused into one loop per vertex.
+        scale = 180.0 / ORIGIN_SHIFT
+        for i in prange(xy.shape[0]):
+            out[i, 0] = xy[i, 0] * scale
+            lat = xy[i, 1] * scale
+            out[i, 1] = 180.0 / math.pi * (
+                2 * math.atan(math.exp(lat * math.pi / 180.0)) - math.pi / 2.0
+            )
+
+    return mercator_kernel
+
+
+def mercator_array_to_lonlat(xy: Sequence[Sequence[float]]) -> np.ndarray:
+    """Convert an (N, 2) array of Web Mercator meters to lon/lat in one pass.
+
+    Columns beyond x and y (e.g. Z or M values) are dropped, so the result
+    is always (N, 2).
+    """
+    xy = np.asarray(xy, dtype=np.float64)
+    if xy.ndim != 2 or xy.shape[1] < 2:
+        raise ValueError(f"Expected an (N, 2) coordinate array, got shape {xy.shape}")
+    xy = xy[:, :2]
+    kernel = load_mercator_kernel() if _use_jit and xy.shape[0] >= JIT_MIN_VERTICES else None
+    if kernel is not None:
+        out = np.empty((xy.shape[0], 2), dtype=np.float64)
+        kernel(xy, out)
+        return out
+    lon = (xy[:, 0] / ORIGIN_SHIFT) * 180.0
+    lat = (xy[:, 1] / ORIGIN_SHIFT) * 180.0
+    lat = 180.0 / np.pi * (2 * np.arctan(np.exp(lat * np.pi / 180.0)) - np.pi / 2.0)
+    return np.column_stack([lon, lat])
+
+
+def convert_parts(parts: List[List[List[float]]]) -> List[np.ndarray]:
+    """Convert every non-empty path or ring of a geometry in one array pass.
+
+    The vertices are packed into a single (N, 2) array, converted once and
+    split back into per-part views, so no per-part Python lists are built.
+    """
+    parts = [part for part in parts if part]
+    if not parts:
+        return []
+    merged = mercator_array_to_lonlat(np.array(list(chain.from_iterable(parts)), dtype=np.float64))
+    offsets = np.cumsum([len(part) for part in parts])[:-1]
+    return np.split(merged, offsets)
+
+
 def sanitize_name(name: str) -> str:
     """Normalize layer names to lowercase snake_case for filenames."""
     slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
@@ -35,7 +131,11 @@ def sanitize_name(name: str) -> str:
 
 
 def convert_geometry(geometry: Dict[str, Any], geometry_type: str) -> Optional[Dict[str, Any]]:
-    """Convert an ESRI geometry dict to a GeoJSON geometry."""
+    """Convert an ESRI geometry dict to a GeoJSON geometry.
+
+    Path and ring coordinates are returned as (N, 2) NumPy arrays; use
+    ``dump_geojson`` to serialize the result.
+    """
     if not geometry:
         return None
 
@@ -44,15 +144,7 @@ def convert_geometry(geometry: Dict[str, Any], geometry_type: str) -> Optional[D
         return {"type": "Point", "coordinates": [lon, lat]}
 
     if geometry_type == "esriGeometryPolyline":
-        paths = geometry.get("paths", [])
-        line_strings = []
-        for path in paths:
-            line = []
-            for x, y in path:
-                lon, lat = mercator_to_lonlat(x, y)
-                line.append([lon, lat])
-            if line:
-                line_strings.append(line)
+        line_strings = convert_parts(geometry.get("paths", []))
         if not line_strings:
             return None
         if len(line_strings) == 1:
@@ -60,15 +152,7 @@ def convert_geometry(geometry: Dict[str, Any], geometry_type: str) -> Optional[D
         return {"type": "MultiLineString", "coordinates": line_strings}
 
     if geometry_type == "esriGeometryPolygon":
-        rings = geometry.get("rings", [])
-        converted = []
-        for ring in rings:
-            converted_ring = []
-            for x, y in ring:
-                lon, lat = mercator_to_lonlat(x, y)
-                converted_ring.append([lon, lat])
-            if converted_ring:
-                converted.append(converted_ring)
+        converted = convert_parts(geometry.get("rings", []))
         if not converted:
             return None
         if len(converted) == 1:
@@ -79,68 +163,174 @@ def convert_geometry(geometry: Dict[str, Any], geometry_type: str) -> Optional[D
     raise ValueError(f"Unsupported geometry type: {geometry_type}")
 
 
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_geojson(payload: Dict[str, Any]) -> bytes:
+    """Serialize a GeoJSON payload that may hold NumPy coordinate arrays."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2)
+    return json.dumps(payload, indent=2, default=_json_default).encode("utf-8")
+
+
+def dump_geojson_line(feature: Dict[str, Any]) -> bytes:
+    """Serialize one feature as a compact, newline-terminated GeoJSON text."""
+    if orjson is not None:
+        return orjson.dumps(
+            feature, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+        )
+    return (json.dumps(feature, separators=(",", ":"), default=_json_default) + "\n").encode("utf-8")
+
+
+def iter_geojson_features(
+    features: List[Dict[str, Any]], geometry_type: str
+) -> Iterator[Dict[str, Any]]:
+    """Yield GeoJSON features for ESRI features that have a usable geometry."""
+    for feature in features:
+        geometry = convert_geometry(feature.get("geometry", {}), geometry_type)
+        if geometry is None:
+            continue
+        properties = feature.get("attributes", {}) or {}
+        yield {"type": "Feature", "geometry": geometry, "properties": properties}
+
+
 def export_feature_collection(
-    layer: Dict[str, Any], fc_layer: Dict[str, Any], out_dir: Path, source_app_id: str
+    layer: Dict[str, Any],
+    fc_layer: Dict[str, Any],
+    out_dir: Path,
+    source_app_id: str,
+    ndjson: bool = False,
 ) -> Optional[Path]:
-    """Write a single feature collection layer to disk as GeoJSON."""
+    """Write a single feature collection layer to disk as GeoJSON.
+
+    With ``ndjson`` the layer is written as newline-delimited GeoJSON
+    (``.geojsonl``), one feature per line as it is converted, and the
+    metadata goes to a ``.meta.json`` sidecar.
+    """
     layer_def = fc_layer.get("layerDefinition", {})
     feature_set = fc_layer.get("featureSet", {})
     geometry_type = layer_def.get("geometryType")
     features = feature_set.get("features", [])
     layer_name = layer_def.get("name") or layer.get("title") or layer.get("id") or "layer"
-    file_name = f"atlas_of_informality_{sanitize_name(layer_name)}.geojson"
-    output_path = out_dir / file_name
+    stem = f"atlas_of_informality_{sanitize_name(layer_name)}"
+    metadata: Dict[str, Any] = {
+        "source_app_id": source_app_id,
+        "source_layer_id": layer.get("id"),
+        "source_layer_title": layer.get("title"),
+        "geometry_type": geometry_type,
+        "feature_count": 0,
+    }
 
-    geojson_features: List[Dict[str, Any]] = []
-    for feature in features:
-        geometry = convert_geometry(feature.get("geometry", {}), geometry_type)
-        if geometry is None:
-            continue
-        properties = feature.get("attributes", {}) or {}
-        geojson_features.append({"type": "Feature", "geometry": geometry, "properties": properties})
+    if ndjson:
+        output_path = out_dir / f"{stem}.geojsonl"
+        count = 0
+        with output_path.open("wb", buffering=1 << 20) as handle:
+            for feature in iter_geojson_features(features, geometry_type):
+                handle.write(dump_geojson_line(feature))
+                count += 1
+        if not count:
+            output_path.unlink()
+            return None
+        metadata["feature_count"] = count
+        (out_dir / f"{stem}.meta.json").write_bytes(dump_geojson(metadata))
+        return output_path
 
+    geojson_features = list(iter_geojson_features(features, geometry_type))
     if not geojson_features:
         return None
 
+    metadata["feature_count"] = len(geojson_features)
     payload = {
         "type": "FeatureCollection",
         "features": geojson_features,
-        "metadata": {
-            "source_app_id": source_app_id,
-            "source_layer_id": layer.get("id"),
-            "source_layer_title": layer.get("title"),
-            "geometry_type": geometry_type,
-            "feature_count": len(geojson_features),
-        },
+        "metadata": metadata,
     }
 
-    output_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    output_path = out_dir / f"{stem}.geojson"
+    output_path.write_bytes(dump_geojson(payload))
     return output_path
 
 
-def process_webmap(input_path: Path, output_dir: Path) -> List[Path]:
-    """Extract feature collection layers from a downloaded ArcGIS web map."""
-    data = json.loads(input_path.read_text(encoding="utf-8"))
-    output_dir.mkdir(parents=True, exist_ok=True)
-    exported_paths: List[Path] = []
+def iter_operational_layers(input_path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the web map's operational layers.
 
-    for layer in data.get("operationalLayers", []):
+    Large files are streamed with ijson when it is installed; smaller ones
+    are decoded in one go.
+    """
+    if ijson is not None and input_path.stat().st_size >= STREAM_MIN_BYTES:
+        with input_path.open("rb") as handle:
+            # use_float keeps numbers as floats rather than Decimal.
+            yield from ijson.items(handle, "operationalLayers.item", use_float=True)
+        return
+
+    raw = input_path.read_bytes()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    yield from data.get("operationalLayers", [])
+
+
+def iter_export_jobs(input_path: Path) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Yield ``(layer_info, fc_layer)`` pairs for each exportable layer as it is read."""
+    for layer in iter_operational_layers(input_path):
         feature_collection = layer.get("featureCollection")
         if not feature_collection:
             continue
+        # Exports only need the layer's id and title, not its sibling layers.
+        layer_info = {"id": layer.get("id"), "title": layer.get("title")}
         for fc_layer in feature_collection.get("layers", []):
             geometry_type = (
                 fc_layer.get("layerDefinition", {}).get("geometryType") or ""
             ).strip()
             if not geometry_type:
                 continue
-            exported = export_feature_collection(
-                layer, fc_layer, output_dir, source_app_id="110e3d637cce4fe7bc41c4e5cd3f9d21"
-            )
-            if exported:
-                exported_paths.append(exported)
+            yield layer_info, fc_layer
+
+
+def process_webmap(input_path: Path, output_dir: Path, ndjson: bool = False) -> List[Path]:
+    """Extract feature collection layers from a downloaded ArcGIS web map.
+
+    Layers are exported as they are streamed in. Once a map turns out to have
+    at least ``PARALLEL_MIN_LAYERS`` layers, they go to worker processes, with
+    only a couple of layers per worker queued at a time.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    exported: List[Optional[Path]] = []
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    in_flight: Deque["Future[Optional[Path]]"] = deque()
+    with ExitStack() as stack:
+        executor: Optional[ProcessPoolExecutor] = None
+        workers = os.cpu_count() or 1
+        for job in iter_export_jobs(input_path):
+            if executor is None:
+                pending.append(job)
+                if len(pending) < PARALLEL_MIN_LAYERS:
+                    continue
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(
+                        max_workers=workers, initializer=enable_jit, initargs=(_use_jit,)
+                    )
+                )
+                jobs, pending = pending, []
+            else:
+                jobs = [job]
+            for layer, fc_layer in jobs:
+                in_flight.append(
+                    executor.submit(
+                        export_feature_collection, layer, fc_layer, output_dir, SOURCE_APP_ID, ndjson
+                    )
+                )
+                while len(in_flight) > 2 * workers:
+                    exported.append(in_flight.popleft().result())
+        exported.extend(future.result() for future in in_flight)
 
-    return exported_paths
+    # Maps with fewer layers are exported serially; process start-up would dominate.
+    for layer, fc_layer in pending:
+        exported.append(export_feature_collection(layer, fc_layer, output_dir, SOURCE_APP_ID, ndjson))
+
+    return [path for path in exported if path]
 
 
 def parse_args() -> argparse.Namespace:
@@ -157,12 +347,32 @@ def parse_args() -> argparse.Namespace:
         default=Path("data/atlas_of_informality"),
         help="Directory for the exported GeoJSON files.",
     )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help=(
+            "Write newline-delimited GeoJSON (.geojsonl, one feature per line) "
+            "plus a .meta.json sidecar instead of FeatureCollection files."
+        ),
+    )
+    parser.add_argument(
+        "--jit",
+        action="store_true",
+        help=(
+            f"Convert coordinate arrays of at least {JIT_MIN_VERTICES} vertices with a "
+            "parallel Numba kernel (requires numba; adds compile time on first use)."
+        ),
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    exported = process_webmap(args.input, args.output_dir)
+    if args.jit:
+        if load_mercator_kernel() is None:
+            raise SystemExit("--jit requires numba.")
+        enable_jit()
+    exported = process_webmap(args.input, args.output_dir, ndjson=args.ndjson)
     if not exported:
         raise SystemExit("No feature collection layers were exported.")
     print("Exported:")